@@ -7,22 +7,28 @@ helper functions to look up values and list the top emitters.
 
 from __future__ import annotations
 
+import sys
+from array import array
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence, Tuple
-
-from ProductionCode.entity_utils import match_entity_name
-from ProductionCode.io_utils import read_csv_records
-from ProductionCode.numbers import parse_float, parse_int
-from ProductionCode.row_utils import latest_year as rows_latest_year
-from ProductionCode.row_utils import latest_year_for_entity as rows_latest_year_for_entity
-from ProductionCode.row_utils import unique_entities as rows_unique_entities
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ProductionCode.entity_utils import match_entity_index
+from ProductionCode.io_utils import (
+    Column,
+    csv_mtime_ns,
+    drop_blank_rows,
+    load_with_sidecar,
+    read_csv_columns,
+)
+from ProductionCode.row_utils import VALUE_TYPECODE, YEAR_TYPECODE, RowTable
 
 CO2_FILENAME = "co-emissions-per-capita.csv"
 CO2_COLUMN = "Annual CO₂ emissions (per capita)"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Co2Row:
     """a single (entity, year) data point for CO₂ per-capita emissions"""
     entity: str
@@ -30,93 +36,153 @@ class Co2Row:
     value_tonnes_per_capita: float
 
 
-def load_co2_rows(data_dir: Path) -> List[Co2Row]:
-    """load co2-per-capita data"""
-    csv_path = data_dir / CO2_FILENAME
-    raw_records = read_csv_records(csv_path)
-
-    rows: List[Co2Row] = []
-    for record in raw_records:
-        value = parse_float(record.get(CO2_COLUMN, ""))
-        if value is None:
-            continue
-        rows.append(
-            Co2Row(
-                entity=record.get("Entity", "").strip(),
-                year=parse_int(record.get("Year", "0")),
-                value_tonnes_per_capita=value,
-            )
+@dataclass(frozen=True)
+class Co2Dataset(RowTable):
+    """column-oriented CO₂ per-capita data, one parallel column per field"""
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Co2Row, List[Co2Row]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Co2Row(
+            entity=self.entities[index],
+            year=self.years[index],
+            value_tonnes_per_capita=self.values[index],
         )
 
-    return rows
+    def __iter__(self) -> Iterator[Co2Row]:
+        for entity, year, value in zip(self.entities, self.years, self.values):
+            yield Co2Row(entity=entity, year=year, value_tonnes_per_capita=value)
+
+
+def load_co2_rows(data_dir: Path) -> Co2Dataset:
+    """load co2-per-capita data into columns"""
+    csv_path = (data_dir / CO2_FILENAME).resolve()
+    return _load_co2_cached(csv_path, csv_mtime_ns(csv_path))
+
+
+@lru_cache(maxsize=4)
+def _load_co2_cached(csv_path: Path, _mtime_ns: int) -> Co2Dataset:
+    """load a co2 CSV once per (path, mtime) for the life of the process"""
+    columns = load_with_sidecar(csv_path, lambda: _parse_co2_csv(csv_path))
+    return Co2Dataset.from_columns(
+        # intern here rather than while parsing so the cached-columns path gets it too
+        entities=list(map(sys.intern, columns["Entity"])),
+        years=columns["Year"],
+        values=columns[CO2_COLUMN],
+    )
+
+
+def _parse_co2_csv(csv_path: Path) -> Dict[str, Column]:
+    """parse the co2-per-capita CSV into typed columns"""
+    columns = drop_blank_rows(
+        read_csv_columns(csv_path, ["Entity", "Year", CO2_COLUMN]),
+        required=CO2_COLUMN,
+    )
+
+    return {
+        "Entity": list(map(str.strip, columns["Entity"])),
+        "Year": array(YEAR_TYPECODE, map(int, columns["Year"])),
+        CO2_COLUMN: array(VALUE_TYPECODE, map(float, columns[CO2_COLUMN])),
+    }
 
 
 def _allowed_entity_set(
     only_countries: bool,
     country_entities: Optional[Iterable[str]],
-) -> Optional[set[str]]:
+) -> Optional[FrozenSet[str]]:
     """return the allowed entity set if filtering to countries, otherwise None"""
     if not only_countries:
         return None
     if country_entities is None:
         return None
-    return set(country_entities)
+    if isinstance(country_entities, frozenset):
+        # already resolved (e.g. by load_country_entities), so skip the O(E) copy
+        return country_entities
+    return frozenset(country_entities)
+
+
+def _country_mask(
+    rows: Co2Dataset,
+    only_countries: bool,
+    country_entities: Optional[Iterable[str]],
+) -> Optional[bytes]:
+    """return a per-row 0/1 mask of country rows, or None when not filtering"""
+    allowed = _allowed_entity_set(only_countries, country_entities)
+    if allowed is None:
+        return None
+    return rows.cached(
+        ("country_mask", allowed),
+        lambda: bytes(entity in allowed for entity in rows.entities),
+    )
 
 
 def entities(
-    rows: Sequence[Co2Row],
+    rows: Co2Dataset,
     only_countries: bool,
     country_entities: Optional[Iterable[str]],
 ) -> List[str]:
     """return unique entity names in the CO₂ dataset"""
-    allowed = _allowed_entity_set(only_countries, country_entities)
+    return rows.entity_names(_country_mask(rows, only_countries, country_entities))
 
-    def row_allowed(r: Co2Row) -> bool:
-        return allowed is None or r.entity in allowed
 
-    return rows_unique_entities(rows, row_filter=row_allowed)
+def _entity_index(
+    rows: Co2Dataset,
+    only_countries: bool,
+    country_entities: Optional[Iterable[str]],
+) -> Dict[str, str]:
+    """return the normalized-name index for the entities passing the country filter"""
+    allowed = _allowed_entity_set(only_countries, country_entities)
+    return rows.cached(
+        ("entity_index", allowed),
+        lambda: rows.entity_index(_country_mask(rows, only_countries, allowed)),
+    )
 
 
 def latest_year_for_entity(
-    rows: Sequence[Co2Row],
+    rows: Co2Dataset,
     entity: str,
     only_countries: bool,
     country_entities: Optional[Iterable[str]],
 ) -> int:
     """return the most recent year with data for an entity"""
     allowed = _allowed_entity_set(only_countries, country_entities)
+    if allowed is None:
+        return rows.latest_year_for(entity)
 
-    def row_allowed(r: Co2Row) -> bool:
-        return allowed is None or r.entity in allowed
-
-    return rows_latest_year_for_entity(rows, entity, row_filter=row_allowed)
+    latest_by_country = rows.cached(
+        ("latest_by_entity", allowed),
+        lambda: {name: yr for name, yr in rows.latest_by_entity.items() if name in allowed},
+    )
+    latest = latest_by_country.get(entity)
+    if latest is None:
+        raise ValueError(f"No data found for entity: {entity}")
+    return latest
 
 
 def latest_year(
-    rows: Sequence[Co2Row],
+    rows: Co2Dataset,
     only_countries: bool,
     country_entities: Optional[Iterable[str]],
 ) -> int:
     """return the most recent year present in the dataset"""
     allowed = _allowed_entity_set(only_countries, country_entities)
-
-    def row_allowed(r: Co2Row) -> bool:
-        return allowed is None or r.entity in allowed
-
-    return rows_latest_year(rows, row_filter=row_allowed)
+    return rows.cached(
+        ("latest_year", allowed),
+        lambda: rows.latest_year(_country_mask(rows, only_countries, allowed)),
+    )
 
 
 def value_for_entity_year(
-    rows: Sequence[Co2Row],
+    rows: Co2Dataset,
     entity_query: str,
     year: Optional[int],
     only_countries: bool,
     country_entities: Optional[Iterable[str]],
 ) -> Tuple[str, int, float]:
     """look up a co2 per-capita value for an entity and year"""
-    entity_name = match_entity_name(
+    entity_name = match_entity_index(
         entity_query,
-        entities(rows, only_countries=only_countries, country_entities=country_entities),
+        _entity_index(rows, only_countries=only_countries, country_entities=country_entities),
     )
 
     year_to_use = (
@@ -130,41 +196,25 @@ def value_for_entity_year(
         )
     )
 
-    for row in rows:
-        if row.entity == entity_name and row.year == year_to_use:
-            return entity_name, year_to_use, row.value_tonnes_per_capita
-
-    raise ValueError(f"No CO₂ per-capita data for {entity_name} in {year_to_use}.")
+    value = rows.by_entity_year.get((entity_name, year_to_use))
+    if value is None:
+        raise ValueError(f"No CO₂ per-capita data for {entity_name} in {year_to_use}.")
+    return entity_name, year_to_use, value
 
 
 def top_emitters(
-    rows: Sequence[Co2Row],
+    rows: Co2Dataset,
     year: int,
     top_n: int,
     only_countries: bool,
     country_entities: Optional[Iterable[str]],
 ) -> List[Tuple[str, float]]:
     """return the top N entities by CO₂ per-capita emissions for *year*"""
-    allowed = _allowed_entity_set(only_countries, country_entities)
-
-    year_rows: List[Co2Row] = []
-    for row in rows:
-        if row.year != year:
-            continue
-        if allowed is not None and row.entity not in allowed:
-            continue
-        year_rows.append(row)
-
-    if not year_rows:
-        raise ValueError(f"No CO₂ per-capita data found for year {year}.")
-
-    year_rows_sorted = sorted(
-        year_rows,
-        key=lambda r: (r.value_tonnes_per_capita, r.entity),
-        reverse=True,
+    year_indices = rows.year_indices(
+        year,
+        _country_mask(rows, only_countries, country_entities),
     )
+    if not year_indices:
+        raise ValueError(f"No CO₂ per-capita data found for year {year}.")
 
-    results: List[Tuple[str, float]] = []
-    for row in year_rows_sorted[:top_n]:
-        results.append((row.entity, row.value_tonnes_per_capita))
-    return results
+    return rows.top_values(year_indices, top_n, largest=True)
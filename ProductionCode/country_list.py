@@ -5,17 +5,11 @@ Helpers for deriving a list of countries from the datasets
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Set
+from typing import FrozenSet
 
-from ProductionCode.forest_change import is_country_row, load_forest_change_rows
+from ProductionCode.forest_change import load_forest_change_rows
 
 
-def load_country_entities(data_dir: Path) -> Set[str]:
+def load_country_entities(data_dir: Path) -> FrozenSet[str]:
     """return the set of country entity names found in the forest dataset"""
-    rows = load_forest_change_rows(data_dir)
-
-    countries: Set[str] = set()
-    for row in rows:
-        if is_country_row(row):
-            countries.add(row.entity)
-    return countries
+    return load_forest_change_rows(data_dir).country_entities
@@ -5,28 +5,36 @@ Utilities for matching user-provided entity names to dataset values
 from __future__ import annotations
 
 import difflib
-import re
+import sys
 import unicodedata
-from typing import Iterable, List
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping
 
 
-_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_KEEP_BYTES = b"abcdefghijklmnopqrstuvwxyz0123456789"
+_DROP_BYTES = bytes(i for i in range(256) if i not in _KEEP_BYTES)
 
 
+@lru_cache(maxsize=8192)
 def normalize_entity_name(name: str) -> str:
     """normalize an entity name for forgiving comparisons"""
-    normalized = unicodedata.normalize("NFKD", name)
-    normalized = normalized.encode("ascii", "ignore").decode("ascii")
-    normalized = normalized.lower()
-    normalized = _NON_ALNUM.sub("", normalized)
-    return normalized
+    normalized = unicodedata.normalize("NFKD", name).encode("ascii", "ignore")
+    # interned so a query key and the stored dataset key compare by identity
+    return sys.intern(normalized.lower().translate(None, _DROP_BYTES).decode("ascii"))
+
+
+def build_entity_index(entities: Iterable[str]) -> Dict[str, str]:
+    """map normalized entity names to their dataset spelling"""
+    return {normalize_entity_name(e): e for e in entities}
 
 
 def match_entity_name(query: str, entities: Iterable[str]) -> str:
     """match a user query to the best entity name from a dataset"""
-    entity_list = list(entities)
-    normalized_to_entity = {normalize_entity_name(e): e for e in entity_list}
+    return match_entity_index(query, build_entity_index(entities))
+
 
+def match_entity_index(query: str, normalized_to_entity: Mapping[str, str]) -> str:
+    """match a user query against a prebuilt build_entity_index mapping"""
     key = normalize_entity_name(query)
     if key in normalized_to_entity:
         return normalized_to_entity[key]
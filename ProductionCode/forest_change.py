@@ -7,22 +7,29 @@ helper functions to look up values, compute rankings, and find default years.
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import sys
+from array import array
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import compress
 from pathlib import Path
-from typing import List, Optional, Sequence, Tuple
-
-from ProductionCode.entity_utils import match_entity_name
-from ProductionCode.io_utils import read_csv_records
-from ProductionCode.numbers import parse_float, parse_int
-from ProductionCode.row_utils import latest_year as rows_latest_year
-from ProductionCode.row_utils import latest_year_for_entity as rows_latest_year_for_entity
-from ProductionCode.row_utils import unique_entities as rows_unique_entities
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple, Union
+
+from ProductionCode.entity_utils import match_entity_index
+from ProductionCode.io_utils import (
+    Column,
+    csv_mtime_ns,
+    drop_blank_rows,
+    load_with_sidecar,
+    read_csv_columns,
+)
+from ProductionCode.row_utils import VALUE_TYPECODE, YEAR_TYPECODE, RowTable
 
 FOREST_CHANGE_FILENAME = "annual-change-forest-area.csv"
 FOREST_CHANGE_COLUMN = "Annual change in forest area"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ForestChangeRow:
     """a single (entity, year) data point for forest-area change"""
     entity: str
@@ -31,167 +38,220 @@ class ForestChangeRow:
     value_ha: float
 
 
-def load_forest_change_rows(data_dir: Path) -> List[ForestChangeRow]:
-    """load forest-change data"""
-    csv_path = data_dir / FOREST_CHANGE_FILENAME
-    raw_records = read_csv_records(csv_path)
-
-    rows: List[ForestChangeRow] = []
-    for record in raw_records:
-        value = parse_float(record.get(FOREST_CHANGE_COLUMN, ""))
-        if value is None:
-            continue
-        rows.append(
-            ForestChangeRow(
-                entity=record.get("Entity", "").strip(),
-                code=record.get("Code", "").strip(),
-                year=parse_int(record.get("Year", "0")),
-                value_ha=value,
-            )
+@dataclass(frozen=True)
+class ForestChangeDataset(RowTable):
+    """column-oriented forest-change data, one parallel column per field"""
+    codes: List[str]
+    country_mask: bytes = field(init=False, repr=False, compare=False)
+    country_entities: FrozenSet[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        # classify each distinct code once instead of re-checking it on every row
+        country_codes = frozenset(code for code in set(self.codes) if _is_country_code(code))
+        country_mask = bytes(code in country_codes for code in self.codes)
+        object.__setattr__(self, "country_mask", country_mask)
+        country_entities = frozenset(compress(self.entities, country_mask))
+        object.__setattr__(self, "country_entities", country_entities)
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[ForestChangeRow, List[ForestChangeRow]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return ForestChangeRow(
+            entity=self.entities[index],
+            code=self.codes[index],
+            year=self.years[index],
+            value_ha=self.values[index],
         )
 
-    return rows
+    def __iter__(self) -> Iterator[ForestChangeRow]:
+        for entity, code, year, value in zip(
+            self.entities, self.codes, self.years, self.values
+        ):
+            yield ForestChangeRow(entity=entity, code=code, year=year, value_ha=value)
+
+
+def load_forest_change_rows(data_dir: Path) -> ForestChangeDataset:
+    """load forest-change data into columns"""
+    csv_path = (data_dir / FOREST_CHANGE_FILENAME).resolve()
+    return _load_forest_change_cached(csv_path, csv_mtime_ns(csv_path))
+
+
+@lru_cache(maxsize=4)
+def _load_forest_change_cached(csv_path: Path, _mtime_ns: int) -> ForestChangeDataset:
+    """load a forest-change CSV once per (path, mtime) for the life of the process"""
+    columns = load_with_sidecar(csv_path, lambda: _parse_forest_change_csv(csv_path))
+    return ForestChangeDataset.from_columns(
+        # intern here rather than while parsing so the cached-columns path gets it too
+        entities=list(map(sys.intern, columns["Entity"])),
+        codes=list(map(sys.intern, columns["Code"])),
+        years=columns["Year"],
+        values=columns[FOREST_CHANGE_COLUMN],
+    )
+
+
+def _parse_forest_change_csv(csv_path: Path) -> Dict[str, Column]:
+    """parse the forest-change CSV into typed columns"""
+    columns = drop_blank_rows(
+        read_csv_columns(csv_path, ["Entity", "Code", "Year", FOREST_CHANGE_COLUMN]),
+        required=FOREST_CHANGE_COLUMN,
+    )
+
+    return {
+        "Entity": list(map(str.strip, columns["Entity"])),
+        "Code": list(map(str.strip, columns["Code"])),
+        "Year": array(YEAR_TYPECODE, map(int, columns["Year"])),
+        FOREST_CHANGE_COLUMN: array(VALUE_TYPECODE, map(float, columns[FOREST_CHANGE_COLUMN])),
+    }
+
+
+@lru_cache(maxsize=None)
+def _is_country_code(code: str) -> bool:
+    """return true if an entity code looks like an ISO country code"""
+    return len(code) == 3 and code.isalpha() and code.isupper()
 
 
 def is_country_row(row: ForestChangeRow) -> bool:
     """return true if row looks like a country"""
-    return len(row.code) == 3 and row.code.isalpha() and row.code.isupper()
+    return _is_country_code(row.code)
+
 
+def _country_mask(rows: ForestChangeDataset, only_countries: bool) -> Optional[bytes]:
+    """return the per-row country mask, or None when not filtering"""
+    return rows.country_mask if only_countries else None
 
-def entities(rows: Sequence[ForestChangeRow], only_countries: bool) -> List[str]:
+
+def entities(rows: ForestChangeDataset, only_countries: bool) -> List[str]:
     """return unique entity names in the dataset"""
+    return rows.entity_names(_country_mask(rows, only_countries))
 
-    def row_allowed(r: ForestChangeRow) -> bool:
-        return (not only_countries) or is_country_row(r)
 
-    return rows_unique_entities(rows, row_filter=row_allowed)
+def _entity_index(rows: ForestChangeDataset, only_countries: bool) -> Dict[str, str]:
+    """return the normalized-name index for the entities passing the country filter"""
+    return rows.cached(
+        ("entity_index", only_countries),
+        lambda: rows.entity_index(_country_mask(rows, only_countries)),
+    )
 
 
-def latest_year_for_entity(rows: Sequence[ForestChangeRow], entity: str) -> int:
+def latest_year_for_entity(rows: ForestChangeDataset, entity: str) -> int:
     """return the most recent year with data for entity"""
-    return rows_latest_year_for_entity(rows, entity)
+    return rows.latest_year_for(entity)
 
 
-def latest_year(rows: Sequence[ForestChangeRow], only_countries: bool) -> int:
+def latest_year(rows: ForestChangeDataset, only_countries: bool) -> int:
     """return the most recent year present in the dataset"""
-
-    def row_allowed(r: ForestChangeRow) -> bool:
-        return (not only_countries) or is_country_row(r)
-
-    return rows_latest_year(rows, row_filter=row_allowed)
+    return rows.cached(
+        ("latest_year", only_countries),
+        lambda: rows.latest_year(_country_mask(rows, only_countries)),
+    )
 
 
 def value_for_entity_year(
-    rows: Sequence[ForestChangeRow],
+    rows: ForestChangeDataset,
     entity_query: str,
     year: Optional[int],
     only_countries: bool,
 ) -> Tuple[str, int, float]:
     """look up a forest-change value for an entity and year"""
-    entity_name = match_entity_name(
-        entity_query,
-        entities(rows, only_countries=only_countries),
-    )
+    entity_name = match_entity_index(entity_query, _entity_index(rows, only_countries))
     year_to_use = year if year is not None else latest_year_for_entity(rows, entity_name)
 
-    for row in rows:
-        if row.entity == entity_name and row.year == year_to_use:
-            return entity_name, year_to_use, row.value_ha
+    value = rows.by_entity_year.get((entity_name, year_to_use))
+    if value is None:
+        raise ValueError(f"No forest change data for {entity_name} in {year_to_use}.")
+    return entity_name, year_to_use, value
 
-    raise ValueError(f"No forest change data for {entity_name} in {year_to_use}.")
 
-
-def _year_rows(
-    rows: Sequence[ForestChangeRow],
-    year: int,
-    only_countries: bool,
-) -> List[ForestChangeRow]:
-    """return all rows for a specific year, respecting the country filter"""
-    year_rows: List[ForestChangeRow] = []
-    for row in rows:
-        if row.year != year:
-            continue
-        if only_countries and not is_country_row(row):
-            continue
-        year_rows.append(row)
-    return year_rows
-
-
-def _sorted_year_rows(
-    rows: Sequence[ForestChangeRow],
+def _ranked_year_indices(
+    rows: ForestChangeDataset,
     year: int,
     order: str,
     only_countries: bool,
-) -> List[ForestChangeRow]:
-    """return year rows sorted by forest change value"""
+) -> List[int]:
+    """validate the ranking order and return the (unsorted) year row indices"""
     if order not in {"loss", "gain"}:
         raise ValueError("order must be 'loss' or 'gain'.")
 
-    year_rows = _year_rows(rows, year=year, only_countries=only_countries)
-    if not year_rows:
+    year_indices = rows.year_indices(year, _country_mask(rows, only_countries))
+    if not year_indices:
         raise ValueError(f"No forest change data found for year {year}.")
-
-    reverse = order == "gain"
-    return sorted(
-        year_rows,
-        key=lambda r: (r.value_ha, r.entity),
-        reverse=reverse,
-    )
+    return year_indices
 
 
 def count_entities_for_year(
-    rows: Sequence[ForestChangeRow],
+    rows: ForestChangeDataset,
     year: int,
     only_countries: bool,
 ) -> int:
     """return the number of entities with data for a given year"""
-    return len(_year_rows(rows, year=year, only_countries=only_countries))
+    counts = rows.cached(
+        ("year_counts", only_countries),
+        lambda: rows.year_counts(_country_mask(rows, only_countries)),
+    )
+    return counts.get(year, 0)
 
 
 def rank_entities(
-    rows: Sequence[ForestChangeRow],
+    rows: ForestChangeDataset,
     year: int,
     order: str,
     top_n: int,
     only_countries: bool,
 ) -> List[Tuple[str, float]]:
     """return the top N entities by forest change for a year"""
-    sorted_rows = _sorted_year_rows(
+    year_indices = _ranked_year_indices(
         rows,
         year=year,
         order=order,
         only_countries=only_countries,
     )
 
-    results: List[Tuple[str, float]] = []
-    for row in sorted_rows[:top_n]:
-        results.append((row.entity, row.value_ha))
-    return results
+    return rows.top_values(year_indices, top_n, largest=order == "gain")
 
 
 def rank_for_entity(
-    rows: Sequence[ForestChangeRow],
+    rows: ForestChangeDataset,
     entity_query: str,
     year: Optional[int],
     order: str,
     only_countries: bool,
 ) -> Tuple[str, int, int, float]:
     """return the rank of one entity for a given year"""
-    entity_name = match_entity_name(
-        entity_query,
-        entities(rows, only_countries=only_countries),
+    entity_name, year_used, rank, _, value = rank_and_count_for_entity(
+        rows,
+        entity_query=entity_query,
+        year=year,
+        order=order,
+        only_countries=only_countries,
     )
+    return entity_name, year_used, rank, value
+
+
+def rank_and_count_for_entity(
+    rows: ForestChangeDataset,
+    entity_query: str,
+    year: Optional[int],
+    order: str,
+    only_countries: bool,
+) -> Tuple[str, int, int, int, float]:
+    """return the rank of one entity for a given year along with the number of ranked entities"""
+    entity_name = match_entity_index(entity_query, _entity_index(rows, only_countries))
     year_used = year if year is not None else latest_year_for_entity(rows, entity_name)
 
-    sorted_rows = _sorted_year_rows(
+    year_indices = _ranked_year_indices(
         rows,
         year=year_used,
         order=order,
         only_countries=only_countries,
     )
 
-    for idx, row in enumerate(sorted_rows, start=1):
-        if row.entity == entity_name:
-            return entity_name, year_used, idx, row.value_ha
+    target = rows.row_for(entity_name, year_used)
+    mask = _country_mask(rows, only_countries)
+    if target is None or (mask is not None and not mask[target]):
+        raise ValueError(f"No forest change data for {entity_name} in {year_used}.")
 
-    raise ValueError(f"No forest change data for {entity_name} in {year_used}.")
+    rank = rows.rank_of(year_indices, target, largest=order == "gain")
+    return entity_name, year_used, rank, len(year_indices), rows.values[target]
@@ -5,8 +5,33 @@ File I/O helper functions for reading CSV datasets.
 from __future__ import annotations
 
 import csv
+import hashlib
+import json
+import os
+import sys
+from array import array
+from itertools import compress
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+# a parsed CSV column: strings, or numbers packed in an array
+Column = Union[List[str], array]
+
+# read CSVs in 1 MiB chunks rather than the 8 KiB default to cut read() calls
+READ_BUFFER_SIZE = 1 << 20
+
+# bump whenever the cached column layout or the CSV parsing changes so old sidecars are ignored
+SIDECAR_VERSION = 1
+SIDECAR_DIRNAME = "team-project-d"
+
+# errors that mean a sidecar is unreadable, truncated or in an older layout
+_STALE_SIDECAR_ERRORS = (
+    OSError,
+    EOFError,
+    KeyError,
+    TypeError,
+    ValueError,
+)
 
 
 def read_csv_records(csv_path: Path) -> List[Dict[str, str]]:
@@ -14,8 +39,149 @@ def read_csv_records(csv_path: Path) -> List[Dict[str, str]]:
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV file not found: {csv_path}")
 
-    with csv_path.open("r", encoding="utf-8", newline="") as handle:
+    with csv_path.open("r", encoding="utf-8", newline="", buffering=READ_BUFFER_SIZE) as handle:
         reader = csv.DictReader(handle)
         if reader.fieldnames is None:
             raise ValueError(f"CSV file has no header row: {csv_path}")
         return list(reader)
+
+
+def csv_mtime_ns(csv_path: Path) -> int:
+    """return a CSV file's modification time in nanoseconds"""
+    try:
+        return csv_path.stat().st_mtime_ns
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(f"CSV file not found: {csv_path}") from exc
+
+
+def read_csv_columns(csv_path: Path, columns: Sequence[str]) -> Dict[str, List[str]]:
+    """read selected CSV columns into a dict of parallel string lists"""
+    if not csv_path.exists():
+        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+
+    with csv_path.open("r", encoding="utf-8", newline="", buffering=READ_BUFFER_SIZE) as handle:
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"CSV file has no header row: {csv_path}")
+
+        missing = [column for column in columns if column not in header]
+        if missing:
+            raise ValueError(f"CSV file is missing column(s) {', '.join(missing)}: {csv_path}")
+
+        # resolve column positions once, then append each field straight into its list
+        values: List[List[str]] = [[] for _ in columns]
+        targets = [
+            (header.index(column), column_values.append)
+            for column, column_values in zip(columns, values)
+        ]
+        try:
+            for row in reader:
+                if not row:
+                    continue
+                for index, append in targets:
+                    append(row[index])
+        except IndexError as exc:
+            raise ValueError(
+                f"CSV row {reader.line_num} has too few fields: {csv_path}"
+            ) from exc
+
+    return dict(zip(columns, values))
+
+
+def drop_blank_rows(columns: Dict[str, List[str]], required: str) -> Dict[str, List[str]]:
+    """drop every row whose *required* column is blank, keeping columns aligned"""
+    keep = list(map(bool, map(str.strip, columns[required])))
+    return {name: list(compress(values, keep)) for name, values in columns.items()}
+
+
+def _sidecar_dir() -> Path:
+    """return this user's cache directory for parsed CSV columns"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / SIDECAR_DIRNAME
+
+
+def _owned_by_current_user(path: Path) -> bool:
+    """return true if path belongs to the running user (always true where uids do not exist)"""
+    if not hasattr(os, "getuid"):
+        return True
+    return path.stat().st_uid == os.getuid()
+
+
+def _read_sidecar(sidecar: Path, key: List[Any]) -> Optional[Dict[str, Column]]:
+    """return the columns stored in sidecar if it was written for key, otherwise None"""
+    if not (_owned_by_current_user(sidecar.parent) and _owned_by_current_user(sidecar)):
+        return None
+
+    with sidecar.open("rb") as handle:
+        header = json.loads(handle.readline())
+        if header["key"] != key:
+            return None
+        columns: Dict[str, Column] = {}
+        for name, typecode, length in header["columns"]:
+            if typecode is None:
+                columns[name] = header["strings"][name]
+            else:
+                numbers = array(typecode)
+                numbers.fromfile(handle, length)
+                columns[name] = numbers
+    return columns
+
+
+def _write_sidecar(sidecar: Path, key: List[Any], columns: Dict[str, Column]) -> None:
+    """store columns in sidecar as a JSON header line followed by the raw numeric arrays"""
+    numeric = {name: col for name, col in columns.items() if isinstance(col, array)}
+    header = {
+        "key": key,
+        "columns": [
+            [name, col.typecode if name in numeric else None, len(col)]
+            for name, col in columns.items()
+        ],
+        "strings": {name: col for name, col in columns.items() if name not in numeric},
+    }
+
+    sidecar.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    # write to a temporary name first so a concurrent reader never sees a partial file
+    partial = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+    try:
+        with partial.open("wb") as handle:
+            handle.write(json.dumps(header).encode("utf-8") + b"\n")
+            # same order as header["columns"], which the reader relies on
+            for numbers in numeric.values():
+                numbers.tofile(handle)
+        partial.replace(sidecar)
+    finally:
+        partial.unlink(missing_ok=True)
+
+
+def load_with_sidecar(
+    csv_path: Path,
+    parse: Callable[[], Dict[str, Column]],
+) -> Dict[str, Column]:
+    """return parse(), reusing a cached copy of its columns while the CSV is unchanged
+
+    The copy lives in the user's cache directory ($XDG_CACHE_HOME or ~/.cache), never
+    next to the CSV, and holds only strings and numbers, so reading it cannot run code.
+    Copies not owned by the current user are ignored.
+    """
+    if not csv_path.exists():
+        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+
+    stat = csv_path.stat()
+    key = [SIDECAR_VERSION, str(csv_path), stat.st_mtime_ns, stat.st_size, sys.byteorder]
+    digest = hashlib.sha256(str(csv_path).encode("utf-8")).hexdigest()
+    sidecar = _sidecar_dir() / f"{digest}.columns"
+
+    try:
+        cached = _read_sidecar(sidecar, key)
+        if cached is not None:
+            return cached
+    except _STALE_SIDECAR_ERRORS:
+        pass
+
+    columns = parse()
+    try:
+        _write_sidecar(sidecar, key, columns)
+    except OSError:
+        pass
+    return columns
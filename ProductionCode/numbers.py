@@ -4,8 +4,14 @@ Number parsing and formatting helpers used by the CLI.
 
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Optional
 
+# bound str.format methods, so each call skips rebuilding an f-string format spec
+_format_integer = "{:,}".format
+_format_two_decimals = "{:,.2f}".format
+_format_decimals = "{:,.{}f}".format
+
 
 def parse_int(value: str) -> int:
     """parse an integer from a string"""
@@ -20,8 +26,12 @@ def parse_float(value: str) -> Optional[float]:
     return float(stripped)
 
 
+@lru_cache(maxsize=2048)
 def format_number(value: float, decimals: int = 2) -> str:
     """format a numeric value for user-facing output"""
-    if abs(value - round(value)) < 1e-9:
-        return f"{int(round(value)):,}"
-    return f"{value:,.{decimals}f}"
+    rounded = round(value)
+    if abs(value - rounded) < 1e-9:
+        return _format_integer(int(rounded))
+    if decimals == 2:
+        return _format_two_decimals(value)
+    return _format_decimals(value, decimals)
@@ -5,12 +5,13 @@ Formatting helpers for turning query results into CLI output.
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Sequence, Tuple
+from itertools import chain
+from typing import Sequence, Tuple
 
 from ProductionCode.numbers import format_number
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RankContext:
     """metadata describing how a ranking was computed"""
     metric: str
@@ -18,7 +19,7 @@ class RankContext:
     order: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RankResult:
     """ranking result for a single entity in a specific year"""
     entity: str
@@ -48,7 +49,8 @@ def format_rank_result(result: RankResult) -> str:
 
 def format_top_list(title: str, rows: Sequence[Tuple[str, float]], unit: str) -> str:
     """format a numbered list of entity/value pairs"""
-    lines: List[str] = [title]
-    for idx, (entity, value) in enumerate(rows, start=1):
-        lines.append(f"{idx}. {entity}: {format_number(value)} {unit}")
-    return "\n".join(lines)
+    entries = (
+        f"{idx}. {entity}: {format_number(value)} {unit}"
+        for idx, (entity, value) in enumerate(rows, start=1)
+    )
+    return "\n".join(chain((title,), entries))
@@ -4,7 +4,28 @@ Shared helpers for working with dataset rows
 
 from __future__ import annotations
 
-from typing import Callable, List, Optional, Protocol, Sequence, TypeVar
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import compress
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from ProductionCode.entity_utils import normalize_entity_name
 
 
 class EntityYearRow(Protocol):
@@ -14,6 +35,173 @@ class EntityYearRow(Protocol):
 
 
 RowT = TypeVar("RowT", bound=EntityYearRow)
+T = TypeVar("T")
+TableT = TypeVar("TableT", bound="RowTable")
+
+# years use a C int so any plausible year parses; values stay doubles so printed figures are exact
+YEAR_TYPECODE = "i"
+VALUE_TYPECODE = "d"
+
+
+@dataclass(frozen=True)
+class RowTable:  # pylint: disable=too-many-instance-attributes
+    """parallel entity/year/value columns plus (entity, year) lookup indexes"""
+    entities: List[str]
+    years: array[int]
+    values: array[float]
+    entity_ids: array[int] = field(init=False, repr=False, compare=False)
+    entity_table: List[str] = field(init=False, repr=False, compare=False)
+    entity_keys: List[str] = field(init=False, repr=False, compare=False)
+    by_entity_year: Dict[Tuple[str, int], float] = field(init=False, repr=False, compare=False)
+    rows_by_entity: Dict[str, List[int]] = field(init=False, repr=False, compare=False)
+    latest_by_entity: Dict[str, int] = field(init=False, repr=False, compare=False)
+    year_order: List[int] = field(init=False, repr=False, compare=False)
+    sorted_years: array[int] = field(init=False, repr=False, compare=False)
+    _cache: Dict[Hashable, Any] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # dictionary-encode the entity column: entity_table[entity_ids[i]] == entities[i]
+        ids: Dict[str, int] = {}
+        entity_ids = array("i", [ids.setdefault(name, len(ids)) for name in self.entities])
+        object.__setattr__(self, "entity_ids", entity_ids)
+        object.__setattr__(self, "entity_table", list(ids))
+        # normalized lookup key per distinct entity, so queries never re-normalize the data;
+        # rebuilt on every construction (never cached on disk), so the keys stay interned
+        entity_keys = [normalize_entity_name(name) for name in ids]
+        object.__setattr__(self, "entity_keys", entity_keys)
+
+        by_entity_year: Dict[Tuple[str, int], float] = {}
+        rows_by_entity: Dict[str, List[int]] = {}
+        for idx, (entity, year, value) in enumerate(zip(self.entities, self.years, self.values)):
+            by_entity_year.setdefault((entity, year), value)
+            rows_by_entity.setdefault(entity, []).append(idx)
+        for entity_rows in rows_by_entity.values():
+            entity_rows.sort(key=self.years.__getitem__)
+
+        object.__setattr__(self, "by_entity_year", by_entity_year)
+        # entity -> its row indices sorted by year; keys are in first-appearance order
+        object.__setattr__(self, "rows_by_entity", rows_by_entity)
+        latest_by_entity = {
+            entity: self.years[entity_rows[-1]] for entity, entity_rows in rows_by_entity.items()
+        }
+        object.__setattr__(self, "latest_by_entity", latest_by_entity)
+
+        # row indices ordered by year (stable), so one year's rows form a contiguous slice
+        year_order = sorted(range(len(self.years)), key=self.years.__getitem__)
+        sorted_years = array(self.years.typecode, [self.years[i] for i in year_order])
+        object.__setattr__(self, "year_order", year_order)
+        object.__setattr__(self, "sorted_years", sorted_years)
+        object.__setattr__(self, "_cache", {})
+
+    @classmethod
+    def from_columns(
+        cls: Type[TableT],
+        entities: List[str],
+        years: array[int],
+        values: array[float],
+        **extra_columns: Any,
+    ) -> TableT:
+        """build a table from its entity/year/value columns plus any subclass columns"""
+        return cls(entities=entities, years=years, values=values, **extra_columns)
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+    def latest_year_for(self, entity: str) -> int:
+        """return the most recent year with data for entity"""
+        latest = self.latest_by_entity.get(entity)
+        if latest is None:
+            raise ValueError(f"No data found for entity: {entity}")
+        return latest
+
+    def row_for(self, entity: str, year: int) -> Optional[int]:
+        """return the index of entity's first row for *year*, or None if it has none"""
+        entity_rows = self.rows_by_entity.get(entity, [])
+        # entity_rows is sorted by year, so bisect straight to the year
+        pos = bisect_left(entity_rows, year, key=self.years.__getitem__)
+        if pos == len(entity_rows) or self.years[entity_rows[pos]] != year:
+            return None
+        return entity_rows[pos]
+
+    def _year_bounds(self, year: int) -> Tuple[int, int]:
+        """return the [start, stop) slice of year_order holding rows for *year*"""
+        start = bisect_left(self.sorted_years, year)
+        return start, bisect_right(self.sorted_years, year, lo=start)
+
+    def year_indices(self, year: int, mask: Optional[bytes] = None) -> List[int]:
+        """return the indices of rows for *year* (and in *mask*), in their original order"""
+        start, stop = self._year_bounds(year)
+        indices = self.year_order[start:stop]
+        if mask is None:
+            return indices
+        return [idx for idx in indices if mask[idx]]
+
+    def year_counts(self, mask: Optional[bytes] = None) -> Dict[int, int]:
+        """return the number of rows per year among rows in *mask*"""
+        return Counter(self.years if mask is None else compress(self.years, mask))
+
+    def entity_names(self, mask: Optional[bytes] = None) -> List[str]:
+        """return distinct entities with at least one row in *mask*, in first-seen order"""
+        table = self.entity_table
+        return [table[entity_id] for entity_id in self._entity_ids_in(mask)]
+
+    def entity_index(self, mask: Optional[bytes] = None) -> Dict[str, str]:
+        """map normalized names to entity names for entities with a row in *mask*"""
+        table = self.entity_table
+        keys = self.entity_keys
+        return {keys[entity_id]: table[entity_id] for entity_id in self._entity_ids_in(mask)}
+
+    def _entity_ids_in(self, mask: Optional[bytes]) -> Iterable[int]:
+        """return the entity ids with at least one row in *mask*, in first-seen order"""
+        all_ids = range(len(self.entity_table))
+        if mask is None:
+            return all_ids
+        present = set(compress(self.entity_ids, mask))
+        return [entity_id for entity_id in all_ids if entity_id in present]
+
+    def latest_year(self, mask: Optional[bytes] = None) -> int:
+        """return the most recent year among rows in *mask*"""
+        return max_year(self.years if mask is None else compress(self.years, mask))
+
+    def _sort_key(self, idx: int) -> Tuple[float, str]:
+        """ranking key for a row: its value, with the entity name breaking ties"""
+        return self.values[idx], self.entities[idx]
+
+    def top_values(
+        self,
+        indices: Sequence[int],
+        top_n: int,
+        largest: bool,
+    ) -> List[Tuple[str, float]]:
+        """return (entity, value) for the top_n rows of *indices* by value"""
+        # only top_n rows are needed, so select them instead of sorting every index
+        select = heapq.nlargest if largest else heapq.nsmallest
+        top_indices = select(top_n, indices, key=self._sort_key)
+        return [(self.entities[i], self.values[i]) for i in top_indices]
+
+    def rank_of(self, indices: Sequence[int], target: int, largest: bool) -> int:
+        """return the 1-based rank of row *target* among *indices* ordered by value"""
+        # the rank is one more than the number of rows that sort ahead of the target
+        target_key = self._sort_key(target)
+        if largest:
+            return 1 + sum(1 for idx in indices if self._sort_key(idx) > target_key)
+        return 1 + sum(1 for idx in indices if self._sort_key(idx) < target_key)
+
+    def cached(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """return compute(), memoized under key for the lifetime of the table"""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+
+def _filtered_rows(
+    rows: Sequence[RowT],
+    row_filter: Optional[Callable[[RowT], bool]],
+) -> Iterable[RowT]:
+    """return the rows passing row_filter, deciding once whether to filter"""
+    if row_filter is None:
+        return rows
+    return filter(row_filter, rows)
 
 
 def unique_entities(
@@ -21,18 +209,9 @@ def unique_entities(
     row_filter: Optional[Callable[[RowT], bool]] = None,
 ) -> List[str]:
     """return unique entity names found in rows"""
-    seen: set[str] = set()
-    result: List[str] = []
-
-    for row in rows:
-        if row_filter is not None and not row_filter(row):
-            continue
-        if row.entity in seen:
-            continue
-        seen.add(row.entity)
-        result.append(row.entity)
-
-    return result
+    # dict keys dedupe in insertion order, so one pass keeps the first-seen order
+    selected = _filtered_rows(rows, row_filter)
+    return list(dict.fromkeys(row.entity for row in selected))
 
 
 def latest_year_for_entity(
@@ -41,16 +220,8 @@ def latest_year_for_entity(
     row_filter: Optional[Callable[[RowT], bool]] = None,
 ) -> int:
     """return the most recent year for a specific entity"""
-    latest: Optional[int] = None
-
-    for row in rows:
-        if row_filter is not None and not row_filter(row):
-            continue
-        if row.entity != entity:
-            continue
-        if latest is None or row.year > latest:
-            latest = row.year
-
+    selected = _filtered_rows(rows, row_filter)
+    latest = max((row.year for row in selected if row.entity == entity), default=None)
     if latest is None:
         raise ValueError(f"No data found for entity: {entity}")
 
@@ -62,15 +233,12 @@ def latest_year(
     row_filter: Optional[Callable[[RowT], bool]] = None,
 ) -> int:
     """return the most recent year present in the dataset"""
-    latest: Optional[int] = None
+    return max_year(row.year for row in _filtered_rows(rows, row_filter))
 
-    for row in rows:
-        if row_filter is not None and not row_filter(row):
-            continue
-        if latest is None or row.year > latest:
-            latest = row.year
 
+def max_year(years: Iterable[int]) -> int:
+    """return the largest year, raising if there are none"""
+    latest = max(years, default=None)
     if latest is None:
         raise ValueError("No data available.")
-
     return latest
@@ -4,15 +4,23 @@ Unit and acceptance tests for the command-line interface
 
 from __future__ import annotations
 
+import os
 import sys
 import tempfile
 import unittest
-from contextlib import redirect_stderr, redirect_stdout
+from array import array
+from contextlib import ExitStack
+from functools import lru_cache, partial
 from io import StringIO
 from pathlib import Path
+from typing import TextIO
+from unittest import mock
 
-from command_line import main
+from command_line import _fast_parse, build_parser, main
 from ProductionCode.co2 import (
+    CO2_FILENAME,
+    Co2Dataset,
+    _parse_co2_csv,
     latest_year as co2_latest_year,
     load_co2_rows,
     top_emitters,
@@ -20,7 +28,12 @@ from ProductionCode.co2 import (
 )
 from ProductionCode.entity_utils import match_entity_name, normalize_entity_name
 from ProductionCode.forest_change import (
+    FOREST_CHANGE_COLUMN,
+    FOREST_CHANGE_FILENAME,
+    ForestChangeDataset,
+    _parse_forest_change_csv,
     count_entities_for_year,
+    entities as forest_entities,
     is_country_row,
     latest_year as forest_latest_year,
     latest_year_for_entity as forest_latest_year_for_entity,
@@ -29,19 +42,77 @@ from ProductionCode.forest_change import (
     rank_for_entity as forest_rank_for_entity,
     value_for_entity_year as forest_value_for_entity_year,
 )
-from ProductionCode.io_utils import read_csv_records
+from ProductionCode.io_utils import (
+    Column,
+    drop_blank_rows,
+    load_with_sidecar,
+    read_csv_columns,
+    read_csv_records,
+)
 from ProductionCode.numbers import format_number
+from ProductionCode.row_utils import unique_entities
 
 DATA_DIR = Path(__file__).resolve().parents[1] / "Data"
 
+# undone in tearDownModule
+_module_cleanup = ExitStack()
+
+
+def setUpModule() -> None:  # pylint: disable=invalid-name
+    """point the column cache at a throwaway directory so tests never touch ~/.cache"""
+    cache = _module_cleanup.enter_context(tempfile.TemporaryDirectory())
+    _module_cleanup.enter_context(mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache}))
+
+
+def tearDownModule() -> None:  # pylint: disable=invalid-name
+    """restore XDG_CACHE_HOME and remove the throwaway cache directory"""
+    _module_cleanup.close()
+
+
+@lru_cache(maxsize=None)
+def get_forest_rows() -> ForestChangeDataset:
+    """return the forest-change dataset, loaded once per test process"""
+    return load_forest_change_rows(DATA_DIR)
+
+
+@lru_cache(maxsize=None)
+def get_co2_rows() -> Co2Dataset:
+    """return the co2 dataset, loaded once per test process"""
+    return load_co2_rows(DATA_DIR)
+
+
+class _CapturingCLIHarness:
+    """swap sys.stdout/sys.stderr for capture buffers that are reused across CLI runs"""
+
+    def __init__(self) -> None:
+        self.out = StringIO()
+        self.err = StringIO()
+        self._saved: tuple[TextIO, TextIO] = (sys.stdout, sys.stderr)
+
+    def __enter__(self) -> _CapturingCLIHarness:
+        for buffer in (self.out, self.err):
+            buffer.seek(0)
+            buffer.truncate()
+        self._saved = (sys.stdout, sys.stderr)
+        sys.stdout, sys.stderr = self.out, self.err
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        sys.stdout, sys.stderr = self._saved
+
+    def run(self, argv: list[str]) -> tuple[int, str, str]:
+        """run the CLI with argv and return the exit code and captured output"""
+        with self:
+            exit_code = main(argv)
+        return exit_code, self.out.getvalue().strip(), self.err.getvalue().strip()
+
+
+_CLI_HARNESS = _CapturingCLIHarness()
+
 
 def run_cli(argv: list[str]) -> tuple[int, str, str]:
     """run the CLI with argv and return"""
-    out = StringIO()
-    err = StringIO()
-    with redirect_stdout(out), redirect_stderr(err):
-        exit_code = main(argv)
-    return exit_code, out.getvalue().strip(), err.getvalue().strip()
+    return _CLI_HARNESS.run(argv)
 
 
 class TestEntityNormalization(unittest.TestCase):
@@ -58,6 +129,14 @@ class TestEntityNormalization(unittest.TestCase):
         with self.assertRaises(ValueError) as ctx:
             match_entity_name("Brazl", ["Brazil", "Canada"])
         self.assertIn("Did you mean", str(ctx.exception))
+        self.assertIn("Brazil", str(ctx.exception))
+        self.assertNotIn("Canada", str(ctx.exception))
+
+    def test_match_entity_name_without_close_matches(self) -> None:
+        """names with no close match should raise without suggestions"""
+        with self.assertRaises(ValueError) as ctx:
+            match_entity_name("Xyzzy", ["Brazil", "Canada"])
+        self.assertEqual(str(ctx.exception), "Unknown entity name.")
 
 
 class TestForestChangeQueries(unittest.TestCase):
@@ -66,7 +145,42 @@ class TestForestChangeQueries(unittest.TestCase):
     @classmethod
     def setUpClass(cls) -> None:
         """load forest-change rows once for the whole test class"""
-        cls.rows = load_forest_change_rows(DATA_DIR)
+        cls.rows = get_forest_rows()
+
+    def test_load_is_cached_per_process(self) -> None:
+        """loading the same unchanged CSV twice should return the same dataset object"""
+        self.assertIs(load_forest_change_rows(DATA_DIR), self.rows)
+
+    def test_text_columns_are_interned(self) -> None:
+        """entity and code strings should be interned whether parsed or read from the cache"""
+        for column in (self.rows.entities, self.rows.codes):
+            self.assertTrue(all(sys.intern(text) is text for text in column))
+
+    def test_entity_keys_share_identity_with_query_keys(self) -> None:
+        """a normalized query should be the very same string object as the stored key"""
+        query_key = normalize_entity_name("  BRAZIL ")
+        stored_key = next(key for key in self.rows.entity_keys if key == query_key)
+        self.assertIs(stored_key, query_key)
+
+    def test_load_reloads_after_csv_changes(self) -> None:
+        """the per-process load cache should be bypassed once the CSV is modified"""
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            tempfile.TemporaryDirectory() as cache,
+            mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache}),
+        ):
+            csv_path = Path(tmp) / FOREST_CHANGE_FILENAME
+            header = f"Entity,Code,Year,{FOREST_CHANGE_COLUMN}\n"
+            csv_path.write_text(header + "Brazil,BRA,2020,-5\n", encoding="utf-8")
+            first = load_forest_change_rows(Path(tmp))
+            self.assertIs(load_forest_change_rows(Path(tmp)), first)
+
+            csv_path.write_text(header + "Brazil,BRA,2020,-7\n", encoding="utf-8")
+            mtime_ns = csv_path.stat().st_mtime_ns + 1_000_000_000
+            os.utime(csv_path, ns=(mtime_ns, mtime_ns))
+            second = load_forest_change_rows(Path(tmp))
+        self.assertIsNot(second, first)
+        self.assertEqual(list(second.values), [-7.0])
 
     def test_latest_year_for_entity_matches_max_in_rows(self) -> None:
         """latest_year_for_entity should match the max year in the raw rows"""
@@ -99,6 +213,18 @@ class TestForestChangeQueries(unittest.TestCase):
         self.assertEqual(year, expected_year)
         self.assertIsInstance(value, float)
 
+    def test_value_for_entity_year_matches_row_scan(self) -> None:
+        """the (entity, year) index should return the value a row scan would find"""
+        for row in self.rows:
+            if row.year == 2015 and is_country_row(row):
+                _, _, value = forest_value_for_entity_year(
+                    rows=self.rows,
+                    entity_query=row.entity,
+                    year=row.year,
+                    only_countries=True,
+                )
+                self.assertEqual(value, row.value_ha)
+
     def test_rank_entities_invalid_order_raises(self) -> None:
         """rank_entities should reject invalid order values"""
         with self.assertRaises(ValueError):
@@ -137,12 +263,49 @@ class TestForestChangeQueries(unittest.TestCase):
         self.assertEqual(ranked[0][0], "Brazil")
         self.assertAlmostEqual(ranked[0][1], -2628412.5, places=1)
 
+    def test_rank_entities_matches_full_sort(self) -> None:
+        """partial top-N selection should match sorting every row of the year"""
+        year_rows = [r for r in self.rows if r.year == 2020 and is_country_row(r)]
+        for order, reverse in (("loss", False), ("gain", True)):
+            expected = sorted(
+                ((r.entity, r.value_ha) for r in year_rows),
+                key=lambda item: (item[1], item[0]),
+                reverse=reverse,
+            )[:5]
+            ranked = forest_rank_entities(
+                rows=self.rows,
+                year=2020,
+                order=order,
+                top_n=5,
+                only_countries=True,
+            )
+            self.assertEqual(ranked, expected)
+
     def test_latest_year_only_countries_filter(self) -> None:
         """latest_year should respect the only_countries filter"""
         year_all = forest_latest_year(self.rows, only_countries=False)
         year_countries = forest_latest_year(self.rows, only_countries=True)
         self.assertGreaterEqual(year_all, year_countries)
 
+    def test_indexed_rows_match_iteration(self) -> None:
+        """rows rebuilt on demand from the columns should match iterating the dataset"""
+        plain_rows = list(self.rows)
+        self.assertEqual(len(plain_rows), len(self.rows))
+        for idx in (0, len(plain_rows) // 2, len(plain_rows) - 1):
+            self.assertEqual(self.rows[idx], plain_rows[idx])
+
+    def test_sliced_rows_match_iteration(self) -> None:
+        """slicing the dataset should return the same rows as slicing a plain list"""
+        plain_rows = list(self.rows)
+        for window in (slice(None, 3), slice(-3, None), slice(1, 40, 7), slice(None, None, -500)):
+            self.assertEqual(self.rows[window], plain_rows[window])
+        self.assertEqual(get_co2_rows()[:3], list(get_co2_rows())[:3])
+
+    def test_entities_match_row_by_row_scan(self) -> None:
+        """the columnar entity listing should match a plain scan over the rows"""
+        expected = unique_entities(list(self.rows), is_country_row)
+        self.assertEqual(forest_entities(self.rows, only_countries=True), expected)
+
 
 class TestCo2Queries(unittest.TestCase):
     """unit tests for co2 per-capita queries"""
@@ -150,9 +313,9 @@ class TestCo2Queries(unittest.TestCase):
     @classmethod
     def setUpClass(cls) -> None:
         """load co2 rows once for the whole test class"""
-        cls.rows = load_co2_rows(DATA_DIR)
+        cls.rows = get_co2_rows()
         cls.country_entities = set()
-        for row in load_forest_change_rows(DATA_DIR):
+        for row in get_forest_rows():
             if is_country_row(row):
                 cls.country_entities.add(row.entity)
 
@@ -228,6 +391,103 @@ class TestIoUtils(unittest.TestCase):
             with self.assertRaises(ValueError):
                 read_csv_records(csv_path)
 
+    def test_read_csv_records_ragged_rows(self) -> None:
+        """short rows should fill missing fields with None and long rows keep extras"""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "ragged.csv"
+            csv_path.write_text("Entity,Year\nBrazil\nChad,2021,extra\n", encoding="utf-8")
+            records = read_csv_records(csv_path)
+        self.assertEqual(records[0], {"Entity": "Brazil", "Year": None})
+        self.assertEqual(records[1], {"Entity": "Chad", "Year": "2021", None: ["extra"]})
+
+    def test_read_csv_columns_selects_columns(self) -> None:
+        """read_csv_columns should return only the requested columns, in file order"""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "columns.csv"
+            csv_path.write_text(
+                "Entity,Code,Year\nBrazil,BRA,2020\nChad,TCD,2021\n",
+                encoding="utf-8",
+            )
+            columns = read_csv_columns(csv_path, ["Year", "Entity"])
+        self.assertEqual(columns, {"Year": ["2020", "2021"], "Entity": ["Brazil", "Chad"]})
+
+    def test_read_csv_columns_missing_column_raises(self) -> None:
+        """asking for a column that is not in the header should raise ValueError"""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "columns.csv"
+            csv_path.write_text("Entity,Year\nBrazil,2020\n", encoding="utf-8")
+            with self.assertRaises(ValueError):
+                read_csv_columns(csv_path, ["Entity", "Code"])
+
+    def test_drop_blank_rows_keeps_columns_aligned(self) -> None:
+        """rows with a blank required value should be removed from every column"""
+        columns = {"Entity": ["A", "B", "C"], "Value": ["1", " ", "3"]}
+        self.assertEqual(
+            drop_blank_rows(columns, required="Value"),
+            {"Entity": ["A", "C"], "Value": ["1", "3"]},
+        )
+
+    def test_load_with_sidecar_reuses_until_csv_changes(self) -> None:
+        """cached columns should be reused until the CSV is modified"""
+        parses: list[str] = []
+
+        def parse() -> dict[str, Column]:
+            parses.append(csv_path.read_text(encoding="utf-8"))
+            return {"Entity": ["Brazil", "Chad"], "Year": array("i", [2019, len(parses)])}
+
+        with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as cache:
+            csv_path = Path(tmp) / "data.csv"
+            csv_path.write_text("Entity\nBrazil\n", encoding="utf-8")
+            with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache}):
+                first = load_with_sidecar(csv_path, parse)
+                self.assertEqual(load_with_sidecar(csv_path, parse), first)
+                self.assertEqual(len(parses), 1)
+
+                csv_path.write_text("Entity\nBrazil\nChad\n", encoding="utf-8")
+                mtime_ns = csv_path.stat().st_mtime_ns + 1_000_000_000
+                os.utime(csv_path, ns=(mtime_ns, mtime_ns))
+                second = load_with_sidecar(csv_path, parse)
+                self.assertEqual(len(parses), 2)
+
+            self.assertEqual(first, {"Entity": ["Brazil", "Chad"], "Year": array("i", [2019, 1])})
+            self.assertEqual(second["Year"], array("i", [2019, 2]))
+            self.assertEqual(list(Path(tmp).iterdir()), [csv_path])
+            self.assertTrue(any(Path(cache).rglob("*.columns")))
+
+    def test_load_with_sidecar_real_data_cold_matches_warm(self) -> None:
+        """columns read back from the cache should equal a cold parse of each real CSV"""
+        sources = (
+            (DATA_DIR / FOREST_CHANGE_FILENAME, _parse_forest_change_csv),
+            (DATA_DIR / CO2_FILENAME, _parse_co2_csv),
+        )
+        for csv_path, parse_csv in sources:
+            with (
+                self.subTest(csv=csv_path.name),
+                tempfile.TemporaryDirectory() as cache,
+                mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache}),
+            ):
+                cold = load_with_sidecar(csv_path, partial(parse_csv, csv_path))
+                warm = load_with_sidecar(csv_path, partial(self.fail, "cache was not reused"))
+                self.assertEqual(warm, cold)
+
+    @unittest.skipUnless(hasattr(os, "getuid"), "file ownership needs POSIX uids")
+    def test_load_with_sidecar_ignores_cache_owned_by_another_user(self) -> None:
+        """a cache file that does not belong to the running user should be parsed over"""
+        parses: list[int] = []
+
+        def parse() -> dict[str, Column]:
+            parses.append(1)
+            return {"Entity": ["Brazil"]}
+
+        with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as cache:
+            csv_path = Path(tmp) / "data.csv"
+            csv_path.write_text("Entity\nBrazil\n", encoding="utf-8")
+            with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache}):
+                load_with_sidecar(csv_path, parse)
+                with mock.patch("ProductionCode.io_utils.os.getuid", return_value=os.getuid() + 1):
+                    self.assertEqual(load_with_sidecar(csv_path, parse), {"Entity": ["Brazil"]})
+        self.assertEqual(len(parses), 2)
+
 
 class TestCommandLineAcceptance(unittest.TestCase):
     """acceptance tests for the CLI (mapped to user stories)"""
@@ -251,7 +511,7 @@ class TestCommandLineAcceptance(unittest.TestCase):
 
     def test_cli_deforestation_default_year(self) -> None:
         """user story 1: default year should be the latest year for that country"""
-        rows = load_forest_change_rows(DATA_DIR)
+        rows = get_forest_rows()
         expected_year = max(r.year for r in rows if r.entity == "Brazil")
         expected_value = next(
             r.value_ha for r in rows if r.entity == "Brazil" and r.year == expected_year
@@ -284,7 +544,7 @@ class TestCommandLineAcceptance(unittest.TestCase):
 
     def test_cli_co2_default_year(self) -> None:
         """user story 2: CO₂ default year should be the latest year for that country"""
-        rows = load_co2_rows(DATA_DIR)
+        rows = get_co2_rows()
         expected_year = max(r.year for r in rows if r.entity == "Canada")
         expected_value = next(
             r.value_tonnes_per_capita
@@ -308,7 +568,7 @@ class TestCommandLineAcceptance(unittest.TestCase):
         self.assertEqual(err, "")
 
         total = count_entities_for_year(
-            load_forest_change_rows(DATA_DIR),
+            get_forest_rows(),
             year=2020,
             only_countries=True,
         )
@@ -361,6 +621,28 @@ class TestCommandLineAcceptance(unittest.TestCase):
         self.assertEqual(exit_code, 0)
         self.assertIn("Brazil in 2020", output)
 
+    def test_fast_parse_matches_argparse(self) -> None:
+        """the argv fast path should agree with argparse, deferring on anything unusual"""
+        parser = build_parser()
+        for argv in (
+            ["--deforestation", "Brazil", "--year", "2020"],
+            ["--co2", "--top", "3", "--include-aggregates"],
+            ["--ranking", "--year", "2020", "--top", "5", "--order", "gain"],
+            ["--ranking", "Brazil", "--data-dir", str(DATA_DIR)],
+        ):
+            self.assertEqual(_fast_parse(argv), parser.parse_args(argv))
+        for argv in (["--help"], ["--co2", "--year=2020"], ["--co2", "--ranking"], []):
+            self.assertIsNone(_fast_parse(argv))
+
+    def test_cli_rejects_top_below_one(self) -> None:
+        """--top 0 or a negative --top should be a usage error on both parse paths"""
+        for argv in (["--ranking", "--top", "0"], ["--co2", "--top", "-3"], ["--co2", "--top=-3"]):
+            self.assertIsNone(_fast_parse(argv))
+            with _CLI_HARNESS, self.assertRaises(SystemExit) as ctx:
+                main(argv)
+            self.assertEqual(ctx.exception.code, 2)
+            self.assertIn("--top: must be at least 1", _CLI_HARNESS.err.getvalue())
+
     def test_cli_error_unknown_country(self) -> None:
         """unknown countries should produce a non-zero exit code and an error message"""
         code, out, err = run_cli(["--deforestation", "NotACountry", "--data-dir", str(DATA_DIR)])
@@ -8,6 +8,7 @@ Command-line interface for querying the project datasets.
 from __future__ import annotations
 
 import argparse
+from functools import lru_cache
 from pathlib import Path
 import sys
 from typing import List, Optional
@@ -22,11 +23,10 @@ from ProductionCode.co2 import (
 from ProductionCode.country_list import load_country_entities
 from ProductionCode.forest_change import (
     FOREST_CHANGE_COLUMN,
-    count_entities_for_year,
     latest_year as forest_latest_year,
     load_forest_change_rows,
+    rank_and_count_for_entity as forest_rank_and_count_for_entity,
     rank_entities as forest_rank_entities,
-    rank_for_entity as forest_rank_for_entity,
     value_for_entity_year as forest_value_for_entity_year,
 )
 from ProductionCode.output_format import (
@@ -39,9 +39,43 @@ from ProductionCode.output_format import (
 
 DEFAULT_TOP_N = 10
 
+FEATURE_FLAGS = ("--deforestation", "--co2", "--ranking")
+ORDER_CHOICES = ("loss", "gain")
 
+DEFAULT_ORDER = ORDER_CHOICES[0]
+
+# resolved once at import rather than on every parse
+_DEFAULT_DATA_DIR = str(Path(__file__).resolve().parent / "Data")
+
+# the default for every parsed option, shared by build_parser and _fast_parse
+_ARG_DEFAULTS = {
+    "deforestation": None,
+    "co2": None,
+    "ranking": None,
+    "year": None,
+    "top": DEFAULT_TOP_N,
+    "order": DEFAULT_ORDER,
+    "include_aggregates": False,
+    "data_dir": _DEFAULT_DATA_DIR,
+}
+VALUE_FLAGS = ("--year", "--top", "--order", "--data-dir")
+
+
+def _positive_int(text: str) -> int:
+    """argparse type for --top: an integer of at least 1"""
+    try:
+        value = int(text)
+    except ValueError:
+        # keep argparse's usual wording for a non-integer
+        raise argparse.ArgumentTypeError(f"invalid int value: {text!r}") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+@lru_cache(maxsize=1)
 def build_parser() -> argparse.ArgumentParser:
-    """build and return the CLI argument parser"""
+    """build the CLI argument parser once and return the shared instance"""
     description = (
         "Query environmental datasets (forest change and CO₂ per capita) "
         "from the command line."
@@ -99,19 +133,16 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--year",
         type=int,
-        default=None,
         help="Year to query (defaults to the most recent available year).",
     )
     parser.add_argument(
         "--top",
-        type=int,
-        default=DEFAULT_TOP_N,
+        type=_positive_int,
         help=f"Number of results to show for list outputs (default {DEFAULT_TOP_N}).",
     )
     parser.add_argument(
         "--order",
-        choices=["loss", "gain"],
-        default="loss",
+        choices=ORDER_CHOICES,
         help=(
             "Ranking order for forest change: 'loss' (most negative first) "
             "or 'gain' (most positive first)."
@@ -125,16 +156,55 @@ def build_parser() -> argparse.ArgumentParser:
             "instead of only countries."
         ),
     )
-    default_data_dir = str(Path(__file__).resolve().parent / "Data")
     parser.add_argument(
         "--data-dir",
-        default=default_data_dir,
         help="Path to the directory containing CSV files (default: ./Data).",
     )
+    parser.set_defaults(**_ARG_DEFAULTS)
 
     return parser
 
 
+def _fast_parse(argv: List[str]) -> Optional[argparse.Namespace]:
+    """parse the common flag patterns directly, or return None to defer to argparse"""
+    parsed = dict(_ARG_DEFAULTS)
+    seen = set()
+    idx = 0
+    while idx < len(argv):
+        flag = argv[idx]
+        idx += 1
+        if flag in seen:
+            return None
+        seen.add(flag)
+        value = argv[idx] if idx < len(argv) and not argv[idx].startswith("-") else None
+
+        if flag == "--include-aggregates":
+            parsed["include_aggregates"] = True
+        elif flag in FEATURE_FLAGS:
+            # COUNTRY is optional for the feature flags, like nargs="?" with const=""
+            parsed[flag[2:]] = "" if value is None else value
+            idx += value is not None
+        elif flag in VALUE_FLAGS and value is not None:
+            parsed[flag[2:].replace("-", "_")] = value
+            idx += 1
+        else:
+            # anything unusual (help, abbreviations, --flag=value, typos) goes to argparse
+            return None
+
+    if sum(parsed[flag[2:]] is not None for flag in FEATURE_FLAGS) != 1:
+        return None
+    if parsed["order"] not in ORDER_CHOICES:
+        return None
+    try:
+        if parsed["year"] is not None:
+            parsed["year"] = int(parsed["year"])
+        parsed["top"] = int(parsed["top"])
+    except ValueError:
+        return None
+    # a --top below 1 is left to argparse, which reports it as a usage error
+    return argparse.Namespace(**parsed) if parsed["top"] >= 1 else None
+
+
 def _data_dir(args: argparse.Namespace) -> Path:
     """return the data directory from parsed CLI args"""
     return Path(args.data_dir)
@@ -187,14 +257,13 @@ def run_ranking(args: argparse.Namespace) -> str:
     only_countries = not args.include_aggregates
 
     if args.ranking:
-        entity, year, rank, value = forest_rank_for_entity(
+        entity, year, rank, total, value = forest_rank_and_count_for_entity(
             rows=rows,
             entity_query=args.ranking,
             year=args.year,
             order=args.order,
             only_countries=only_countries,
         )
-        total = count_entities_for_year(rows, year=year, only_countries=only_countries)
         context = RankContext(metric=FOREST_CHANGE_COLUMN, unit="ha", order=args.order)
         result = RankResult(
             entity=entity,
@@ -229,9 +298,10 @@ def run_co2(args: argparse.Namespace) -> str:
     data_dir = _data_dir(args)
     rows = load_co2_rows(data_dir)
 
-    # use the forest dataset to determine which entities count as countries
-    country_entities = load_country_entities(data_dir)
+    # use the forest dataset to determine which entities count as countries,
+    # and only read it when the query is actually filtered to countries
     only_countries = not args.include_aggregates
+    country_entities = load_country_entities(data_dir) if only_countries else None
 
     if args.co2:
         entity, year, value = co2_value_for_entity_year(
@@ -273,8 +343,9 @@ def run_co2(args: argparse.Namespace) -> str:
 
 def main(argv: Optional[List[str]] = None) -> int:
     """run the CLI and return a process exit code"""
-    parser = build_parser()
-    args = parser.parse_args(argv)
+    args = _fast_parse(sys.argv[1:] if argv is None else argv)
+    if args is None:
+        args = build_parser().parse_args(argv)
 
     try:
         if args.deforestation is not None:
@@ -284,10 +355,10 @@ def main(argv: Optional[List[str]] = None) -> int:
         else:
             output = run_ranking(args)
     except (FileNotFoundError, ValueError) as exc:
-        print(f"Error: {exc}", file=sys.stderr)
+        sys.stderr.write(f"Error: {exc}\n")
         return 2
 
-    print(output)
+    sys.stdout.write(f"{output}\n")
     return 0
 
 